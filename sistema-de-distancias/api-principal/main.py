@@ -1,18 +1,31 @@
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import httpx
+import orjson
 import sqlite3
 import os
 import datetime
+import time
+import queue
 from contextlib import contextmanager
 import uuid
-import json
+import base64
+import re
 from http import HTTPStatus
 import uvicorn
+import asyncio
+from cachetools import TLRUCache
+import logging
 
-app = FastAPI(title="API Principal - Sistema de Consulta de Endereços e Distâncias")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(
+    title="API Principal - Sistema de Consulta de Endereços e Distâncias",
+    default_response_class=ORJSONResponse
+)
 
 # Configuração de CORS
 app.add_middleware(
@@ -58,6 +71,10 @@ class HistoryItem(BaseModel):
     result: str
     created_at: str
 
+class HistoryPage(BaseModel):
+    items: List[HistoryItem]
+    next_cursor: Optional[str] = None
+
 class User(BaseModel):
     id: Optional[str] = None
     name: str = Field(..., min_length=3)
@@ -69,18 +86,70 @@ class UserUpdate(BaseModel):
     email: Optional[str] = Field(None, min_length=5)
     preferences: Optional[dict] = None
 
+# Consultas ao ViaCEP em andamento (CEP normalizado -> tarefa), compartilhadas entre
+# requisições concorrentes para o mesmo CEP
+_inflight: "dict[str, asyncio.Future[Address]]" = {}
+
+# Expressão pré-compilada para remover caracteres não numéricos do CEP
+_NON_DIGIT = re.compile(r"[^0-9]+")
+
+# Cache em memória dos endereços consultados (CEP normalizado -> (Address, expiração)).
+# Cada entrada expira quando o registro completa 30 dias desde a última atualização,
+# o mesmo prazo usado para renovar os dados do banco junto ao ViaCEP
+ADDRESS_MAX_AGE = datetime.timedelta(days=30)
+_addr_cache: "TLRUCache[str, tuple[Address, float]]" = TLRUCache(
+    maxsize=10_000,
+    ttu=lambda _cep, entry, _now: entry[1],
+    timer=time.time
+)
+
+def cache_address(cep, addr, last_updated):
+    _addr_cache[cep] = (addr, (last_updated + ADDRESS_MAX_AGE).timestamp())
+
 # Funções de banco de dados
+# Pool de conexões abertas na inicialização e reaproveitadas entre requisições.
+# Em modo autocommit (isolation_level=None) as transações são abertas com BEGIN explícito.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+_db_pool = queue.SimpleQueue()
+
+def _connect():
+    conn = sqlite3.connect(
+        DATABASE_URL,
+        check_same_thread=False,
+        cached_statements=512,
+        isolation_level=None
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA cache_size = -16000")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA mmap_size = 268435456")
+    return conn
+
+def init_db_pool():
+    for _ in range(DB_POOL_SIZE):
+        _db_pool.put(_connect())
+
+def close_db_pool():
+    while not _db_pool.empty():
+        _db_pool.get().close()
+
 @contextmanager
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE_URL)
-    conn.row_factory = sqlite3.Row
+    conn = _db_pool.get()
     try:
         yield conn
     finally:
-        conn.close()
+        # Descartar transações não finalizadas antes de devolver a conexão ao pool
+        if conn.in_transaction:
+            conn.rollback()
+        _db_pool.put(conn)
 
 def init_db():
     with get_db_connection() as conn:
+        # WAL permite leituras concorrentes durante escritas (persistente no arquivo)
+        conn.execute("PRAGMA journal_mode = WAL")
+        
         conn.execute("""
         CREATE TABLE IF NOT EXISTS history (
             id TEXT PRIMARY KEY,
@@ -91,6 +160,20 @@ def init_db():
         )
         """)
         
+        # Índice para a listagem do histórico ordenada por data
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_history_created
+        ON history (created_at DESC, id DESC)
+        """)
+        
+        # Índice funcional para filtrar o histórico por CEP (JSON1); registros antigos
+        # gravados fora do formato JSON ficam de fora do índice
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_history_cep
+        ON history (json_extract(query_data, '$.cep'))
+        WHERE json_valid(query_data)
+        """)
+        
         conn.execute("""
         CREATE TABLE IF NOT EXISTS users (
             id TEXT PRIMARY KEY,
@@ -117,10 +200,88 @@ def init_db():
         """)
         conn.commit()
 
-# Inicializar o banco de dados ao iniciar a aplicação
+# Gravação do histórico em segundo plano: as consultas são enfileiradas e um único
+# escritor as insere em lotes, sem bloquear a resposta ao cliente
+HISTORY_BATCH_SIZE = 64
+HISTORY_FLUSH_INTERVAL = 0.05  # segundos
+
+def log_history(query_type, query_data, result):
+    app.state.history_queue.put_nowait((
+        str(uuid.uuid4()),
+        query_type,
+        query_data,
+        result,
+        datetime.datetime.now().isoformat()
+    ))
+
+def _write_history(rows):
+    with get_db_connection() as conn:
+        conn.execute("BEGIN")
+        conn.executemany("""
+        INSERT INTO history (id, query_type, query_data, result, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+
+async def _history_writer():
+    history_queue = app.state.history_queue
+    loop = asyncio.get_running_loop()
+    running = True
+    while running:
+        rows = []
+        item = await history_queue.get()
+        deadline = loop.time() + HISTORY_FLUSH_INTERVAL
+        # Acumular até HISTORY_BATCH_SIZE registros ou HISTORY_FLUSH_INTERVAL segundos;
+        # None sinaliza o encerramento da aplicação
+        while item is not None:
+            rows.append(item)
+            if len(rows) >= HISTORY_BATCH_SIZE:
+                break
+            try:
+                item = await asyncio.wait_for(history_queue.get(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                break
+        else:
+            running = False
+        
+        if rows:
+            try:
+                await asyncio.to_thread(_write_history, rows)
+            except Exception:
+                logger.exception("Erro ao gravar %d registros no histórico", len(rows))
+
+# Inicializar o banco de dados e o cliente HTTP compartilhado ao iniciar a aplicação
 @app.on_event("startup")
 async def startup_event():
+    init_db_pool()
     init_db()
+    app.state.history_queue = asyncio.Queue()
+    app.state.history_writer = asyncio.create_task(_history_writer())
+    # Um único cliente reaproveita conexões (keep-alive) com o ViaCEP e a API secundária
+    app.state.http = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100),
+        timeout=httpx.Timeout(5.0)
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Gravar o histórico pendente antes de fechar as conexões
+    app.state.history_queue.put_nowait(None)
+    await app.state.history_writer
+    await app.state.http.aclose()
+    close_db_pool()
+
+# Paginação por cursor (keyset): o cursor codifica (created_at, id) do último item
+# da página, evitando que o SQLite percorra e descarte registros com OFFSET
+def encode_cursor(created_at, item_id):
+    return base64.urlsafe_b64encode(f"{created_at}|{item_id}".encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        created_at, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return created_at, item_id
 
 # Rotas da API
 @app.get("/")
@@ -130,11 +291,16 @@ async def root():
 @app.get("/address/{cep}", response_model=Address)
 async def get_address(cep: str):
     # Remover caracteres não numéricos do CEP
-    cep = ''.join(filter(str.isdigit, cep))
+    cep = _NON_DIGIT.sub("", cep)
     
     if len(cep) != 8:
         raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="CEP deve conter 8 dígitos")
     
+    # Verificar se o endereço está no cache em memória
+    cached = _addr_cache.get(cep)
+    if cached is not None:
+        return cached[0]
+    
     # Verificar se o endereço está no banco de dados local
     with get_db_connection() as conn:
         result = conn.execute("SELECT * FROM addresses WHERE cep = ?", (cep,)).fetchone()
@@ -144,141 +310,150 @@ async def get_address(cep: str):
             address_dict = dict(result)
             # Verificar se o endereço foi atualizado recentemente (menos de 30 dias)
             last_updated = datetime.datetime.fromisoformat(address_dict["last_updated"])
-            if (datetime.datetime.now() - last_updated).days < 30:
-                return Address(**address_dict)
+            if datetime.datetime.now() - last_updated < ADDRESS_MAX_AGE:
+                # Dados gravados pela própria aplicação: dispensam nova validação
+                addr = Address.model_construct(
+                    **{field: address_dict[field] for field in Address.model_fields}
+                )
+                cache_address(cep, addr, last_updated)
+                return addr
     
-    # Se não estiver no banco ou estiver desatualizado, consultar a API do ViaCEP
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"https://viacep.com.br/ws/{cep}/json/")
-        
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail="Erro ao consultar ViaCEP")
-        
-        data = response.json()
-        
-        if "erro" in data and data["erro"]:
-            raise HTTPException(status_code=404, detail="CEP não encontrado")
-        
-        # Salvar o endereço no banco de dados local
-        with get_db_connection() as conn:
-            now = datetime.datetime.now().isoformat()
-            conn.execute("""
-            INSERT OR REPLACE INTO addresses 
-            (cep, logradouro, complemento, bairro, localidade, uf, ibge, gia, ddd, siafi, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                data.get("cep", "").replace("-", ""),
-                data.get("logradouro", ""),
-                data.get("complemento", ""),
-                data.get("bairro", ""),
-                data.get("localidade", ""),
-                data.get("uf", ""),
-                data.get("ibge", ""),
-                data.get("gia", ""),
-                data.get("ddd", ""),
-                data.get("siafi", ""),
-                now
-            ))
-            conn.commit()
-            
-            # Registrar a consulta no histórico
-            history_id = str(uuid.uuid4())
-            conn.execute("""
-            INSERT INTO history (id, query_type, query_data, result, created_at)
-            VALUES (?, ?, ?, ?, ?)
-            """, (
-                history_id,
-                "address_query",
-                cep,
-                str(data),
-                now
-            ))
-            conn.commit()
-        
-        return Address(**data)
+    # Se não estiver no banco ou estiver desatualizado, consultar a API do ViaCEP.
+    # Requisições concorrentes para o mesmo CEP aguardam a mesma consulta; o shield
+    # evita que o cancelamento de uma delas interrompa a consulta das demais
+    fetch = _inflight.get(cep)
+    if fetch is None:
+        fetch = asyncio.ensure_future(fetch_address(cep))
+        _inflight[cep] = fetch
+        fetch.add_done_callback(lambda _: _inflight.pop(cep, None))
+    return await asyncio.shield(fetch)
+
+async def fetch_address(cep):
+    _addr_cache.pop(cep, None)
+    client = app.state.http
+    response = await client.get(f"https://viacep.com.br/ws/{cep}/json/")
+    
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="Erro ao consultar ViaCEP")
+    
+    data = response.json()
+    
+    if "erro" in data and data["erro"]:
+        raise HTTPException(status_code=404, detail="CEP não encontrado")
+    
+    # Validar o retorno do ViaCEP uma única vez e reaproveitar o modelo
+    addr = Address.model_validate(data)
+    
+    # Salvar o endereço no banco de dados local
+    address_row = addr.model_dump()
+    address_row["cep"] = address_row["cep"].replace("-", "")
+    last_updated = datetime.datetime.now()
+    address_row["last_updated"] = last_updated.isoformat()
+    with get_db_connection() as conn:
+        conn.execute("""
+        INSERT OR REPLACE INTO addresses 
+        (cep, logradouro, complemento, bairro, localidade, uf, ibge, gia, ddd, siafi, last_updated)
+        VALUES (:cep, :logradouro, :complemento, :bairro, :localidade, :uf, :ibge, :gia, :ddd, :siafi, :last_updated)
+        """, address_row)
+        conn.commit()
+    
+    # Registrar a consulta no histórico
+    log_history("address_query", orjson.dumps({"cep": cep}).decode(), orjson.dumps(data).decode())
+    
+    cache_address(cep, addr, last_updated)
+    return addr
 
 @app.post("/distances", response_model=DistanceResponse)
 async def calculate_distance(request: DistanceRequest):
     # Obter os endereços de origem e destino
-    async with httpx.AsyncClient() as client:
-        # Obter endereço de origem
-        origin_response = await client.get(f"https://viacep.com.br/ws/{request.origin_cep}/json/")
-        if origin_response.status_code != 200:
-            raise HTTPException(status_code=origin_response.status_code, detail="Erro ao consultar endereço de origem")
-        origin_data = origin_response.json()
-        if "erro" in origin_data and origin_data["erro"]:
-            raise HTTPException(status_code=404, detail="CEP de origem não encontrado")
-        
-        # Obter endereço de destino
-        dest_response = await client.get(f"https://viacep.com.br/ws/{request.destination_cep}/json/")
-        if dest_response.status_code != 200:
-            raise HTTPException(status_code=dest_response.status_code, detail="Erro ao consultar endereço de destino")
-        dest_data = dest_response.json()
-        if "erro" in dest_data and dest_data["erro"]:
-            raise HTTPException(status_code=404, detail="CEP de destino não encontrado")
-        
-        # Enviar os dados para a API secundária para calcular a distância
-        secondary_api_url = os.getenv("SECONDARY_API_URL", "http://api-secundaria:5000")
-        
-        # Preparar os dados para enviar à API secundária
-        payload = {
-            "origin": {
-                "city": origin_data["localidade"],
-                "state": origin_data["uf"],
-                "address": f"{origin_data['logradouro']}, {origin_data['bairro']}"
-            },
-            "destination": {
-                "city": dest_data["localidade"],
-                "state": dest_data["uf"],
-                "address": f"{dest_data['logradouro']}, {dest_data['bairro']}"
-            },
-            "mode": request.travel_mode
-        }
-        
-        # Chamar a API secundária
-        calc_response = await client.post(f"{secondary_api_url}/calculate", json=payload)
-        
-        if calc_response.status_code != 200:
-            raise HTTPException(
-                status_code=calc_response.status_code, 
-                detail=f"Erro ao calcular distância: {calc_response.text}"
-            )
-        
-        distance_data = calc_response.json()
-        
-        # Registrar a consulta no histórico
-        with get_db_connection() as conn:
-            history_id = str(uuid.uuid4())
-            now = datetime.datetime.now().isoformat()
-            conn.execute("""
-            INSERT INTO history (id, query_type, query_data, result, created_at)
-            VALUES (?, ?, ?, ?, ?)
-            """, (
-                history_id,
-                "distance_calculation",
-                str(request.dict()),
-                str(distance_data),
-                now
-            ))
-            conn.commit()
-        
-        # Construir a resposta
-        response = DistanceResponse(
-            origin=Address(**origin_data),
-            destination=Address(**dest_data),
-            distance=distance_data["distance"],
-            unit=distance_data["unit"],
-            travel_mode=request.travel_mode
+    client = app.state.http
+    # Consultar origem e destino em paralelo
+    origin_coro = client.get(f"https://viacep.com.br/ws/{request.origin_cep}/json/")
+    dest_coro = client.get(f"https://viacep.com.br/ws/{request.destination_cep}/json/")
+    origin_response, dest_response = await asyncio.gather(origin_coro, dest_coro)
+    
+    # Validar endereço de origem
+    if origin_response.status_code != 200:
+        raise HTTPException(status_code=origin_response.status_code, detail="Erro ao consultar endereço de origem")
+    origin_data = origin_response.json()
+    if "erro" in origin_data and origin_data["erro"]:
+        raise HTTPException(status_code=404, detail="CEP de origem não encontrado")
+    
+    # Validar endereço de destino
+    if dest_response.status_code != 200:
+        raise HTTPException(status_code=dest_response.status_code, detail="Erro ao consultar endereço de destino")
+    dest_data = dest_response.json()
+    if "erro" in dest_data and dest_data["erro"]:
+        raise HTTPException(status_code=404, detail="CEP de destino não encontrado")
+    
+    # Enviar os dados para a API secundária para calcular a distância
+    secondary_api_url = os.getenv("SECONDARY_API_URL", "http://api-secundaria:5000")
+    
+    # Preparar os dados para enviar à API secundária
+    payload = {
+        "origin": {
+            "city": origin_data["localidade"],
+            "state": origin_data["uf"],
+            "address": f"{origin_data['logradouro']}, {origin_data['bairro']}"
+        },
+        "destination": {
+            "city": dest_data["localidade"],
+            "state": dest_data["uf"],
+            "address": f"{dest_data['logradouro']}, {dest_data['bairro']}"
+        },
+        "mode": request.travel_mode
+    }
+    
+    # Chamar a API secundária
+    calc_response = await client.post(f"{secondary_api_url}/calculate", json=payload)
+    
+    if calc_response.status_code != 200:
+        raise HTTPException(
+            status_code=calc_response.status_code, 
+            detail=f"Erro ao calcular distância: {calc_response.text}"
         )
-        
-        return response
+    
+    distance_data = calc_response.json()
+    
+    # Registrar a consulta no histórico
+    log_history(
+        "distance_calculation",
+        request.model_dump_json(),
+        orjson.dumps(distance_data).decode()
+    )
+    
+    # Construir a resposta
+    response = DistanceResponse(
+        origin=Address.model_validate(origin_data),
+        destination=Address.model_validate(dest_data),
+        distance=distance_data["distance"],
+        unit=distance_data["unit"],
+        travel_mode=request.travel_mode
+    )
+    
+    return response
 
-@app.get("/history", response_model=List[HistoryItem])
-async def get_history(limit: int = 10, skip: int = 0):
+@app.get("/history", response_model=HistoryPage)
+async def get_history(limit: int = 10, cursor: Optional[str] = None, cep: Optional[str] = None):
+    conditions = []
+    params = []
+    
+    if cep:
+        # Mesma expressão do índice idx_history_cep
+        conditions.append("json_valid(query_data) AND json_extract(query_data, '$.cep') = ?")
+        params.append(_NON_DIGIT.sub("", cep))
+    
+    if cursor:
+        conditions.append("(created_at, id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit)
+    
     with get_db_connection() as conn:
         result = conn.execute(
-            "SELECT * FROM history ORDER BY created_at DESC LIMIT ? OFFSET ?", 
-            (limit, skip)
+            f"SELECT * FROM history {where} ORDER BY created_at DESC, id DESC LIMIT ?", 
+            params
         ).fetchall()
         
         history_items = [
@@ -292,7 +467,11 @@ async def get_history(limit: int = 10, skip: int = 0):
             for row in result
         ]
         
-        return history_items
+        next_cursor = None
+        if history_items and len(history_items) == limit:
+            next_cursor = encode_cursor(history_items[-1].created_at, history_items[-1].id)
+        
+        return HistoryPage(items=history_items, next_cursor=next_cursor)
 
 @app.delete("/history/{history_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_history_item(history_id: str):
@@ -312,71 +491,67 @@ async def create_user(user: User):
     user_id = str(uuid.uuid4())
     
     with get_db_connection() as conn:
-        # Verificar se o e-mail já está em uso
-        existing = conn.execute("SELECT id FROM users WHERE email = ?", (user.email,)).fetchone()
-        if existing:
+        # Criar o usuário; a restrição UNIQUE de email rejeita e-mails já cadastrados
+        try:
+            conn.execute(
+                "INSERT INTO users (id, name, email, preferences) VALUES (?, ?, ?, ?)",
+                (user_id, user.name, user.email, orjson.dumps(user.preferences or {}).decode())
+            )
+        except sqlite3.IntegrityError:
             raise HTTPException(status_code=400, detail="E-mail já cadastrado")
-        
-        # Criar o usuário
-        conn.execute(
-            "INSERT INTO users (id, name, email, preferences) VALUES (?, ?, ?, ?)",
-            (user_id, user.name, user.email, str(user.preferences or {}))
-        )
         conn.commit()
     
     return User(id=user_id, name=user.name, email=user.email, preferences=user.preferences)
 
 @app.put("/users/{user_id}", response_model=User)
 async def update_user(user_id: str, user_update: UserUpdate):
+    # Atualizar apenas os campos fornecidos
+    update_fields = []
+    params = []
+    
+    if user_update.name is not None:
+        update_fields.append("name = ?")
+        params.append(user_update.name)
+    
+    if user_update.email is not None:
+        update_fields.append("email = ?")
+        params.append(user_update.email)
+    
+    if user_update.preferences is not None:
+        update_fields.append("preferences = ?")
+        params.append(orjson.dumps(user_update.preferences).decode())
+    
     with get_db_connection() as conn:
-        # Verificar se o usuário existe
-        existing = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
-        if not existing:
-            raise HTTPException(status_code=404, detail="Usuário não encontrado")
-        
-        existing_dict = dict(existing)
-        
-        # Atualizar apenas os campos fornecidos
-        update_fields = []
-        params = []
-        
-        if user_update.name is not None:
-            update_fields.append("name = ?")
-            params.append(user_update.name)
-        
-        if user_update.email is not None:
-            # Verificar se o novo e-mail já está em uso por outro usuário
-            if user_update.email != existing_dict["email"]:
-                email_check = conn.execute(
-                    "SELECT id FROM users WHERE email = ? AND id != ?", 
-                    (user_update.email, user_id)
-                ).fetchone()
-                if email_check:
-                    raise HTTPException(status_code=400, detail="E-mail já cadastrado por outro usuário")
-            
-            update_fields.append("email = ?")
-            params.append(user_update.email)
-        
-        if user_update.preferences is not None:
-            update_fields.append("preferences = ?")
-            params.append(str(user_update.preferences))
-        
         if update_fields:
-            # Construir e executar a query de atualização
-            query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = ?"
+            # Construir e executar a query de atualização, obtendo os dados atualizados
+            # do usuário na mesma instrução (RETURNING)
+            query = (
+                f"UPDATE users SET {', '.join(update_fields)} WHERE id = ? "
+                "RETURNING id, name, email, preferences"
+            )
             params.append(user_id)
-            conn.execute(query, params)
+            try:
+                updated = conn.execute(query, params).fetchone()
+            except sqlite3.IntegrityError:
+                # Restrição UNIQUE de email: o novo e-mail pertence a outro usuário
+                raise HTTPException(status_code=400, detail="E-mail já cadastrado por outro usuário")
             conn.commit()
+        else:
+            updated = conn.execute(
+                "SELECT id, name, email, preferences FROM users WHERE id = ?", (user_id,)
+            ).fetchone()
+        
+        # Nenhuma linha afetada/encontrada: o usuário não existe
+        if not updated:
+            raise HTTPException(status_code=404, detail="Usuário não encontrado")
         
-        # Obter os dados atualizados do usuário
-        updated = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
         updated_dict = dict(updated)
         
         return User(
             id=updated_dict["id"],
             name=updated_dict["name"],
             email=updated_dict["email"],
-            preferences = json.loads(updated_dict["preferences"]) if updated_dict["preferences"] else {}
+            preferences = orjson.loads(updated_dict["preferences"]) if updated_dict["preferences"] else {}
         )
 
 @app.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -1,29 +1,71 @@
 from fastapi import FastAPI, HTTPException, Request, Depends
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
+from typing import List, Optional
 import sqlite3
 import math
+import numpy as np
+from numba import njit
 import os
 import uuid
+import base64
 import datetime
+import asyncio
+import logging
+import queue
 from contextlib import contextmanager
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Configuração do banco de dados
 DATABASE_URL = os.getenv("DATABASE_URL", "distance_calculations.db")
 
 # Funções de banco de dados
+# Pool de conexões abertas na inicialização e reaproveitadas entre requisições.
+# Em modo autocommit (isolation_level=None) as transações são abertas com BEGIN explícito.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+_db_pool = queue.SimpleQueue()
+
+def _connect():
+    conn = sqlite3.connect(
+        DATABASE_URL,
+        check_same_thread=False,
+        cached_statements=512,
+        isolation_level=None
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA cache_size = -16000")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA mmap_size = 268435456")
+    return conn
+
+def init_db_pool():
+    for _ in range(DB_POOL_SIZE):
+        _db_pool.put(_connect())
+
+def close_db_pool():
+    while not _db_pool.empty():
+        _db_pool.get().close()
+
 @contextmanager
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE_URL)
-    conn.row_factory = sqlite3.Row
+    conn = _db_pool.get()
     try:
         yield conn
     finally:
-        conn.close()
+        # Descartar transações não finalizadas antes de devolver a conexão ao pool
+        if conn.in_transaction:
+            conn.rollback()
+        _db_pool.put(conn)
 
 def init_db():
     with get_db_connection() as conn:
+        # WAL permite leituras concorrentes durante escritas (persistente no arquivo)
+        conn.execute("PRAGMA journal_mode = WAL")
+        
         conn.execute("""
         CREATE TABLE IF NOT EXISTS calculations (
             id TEXT PRIMARY KEY,
@@ -40,6 +82,12 @@ def init_db():
         )
         """)
         
+        # Índice para a listagem de cálculos ordenada por data
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_calculations_created
+        ON calculations (created_at DESC, id DESC)
+        """)
+        
         conn.execute("""
         CREATE TABLE IF NOT EXISTS configurations (
             id TEXT PRIMARY KEY,
@@ -57,29 +105,110 @@ def init_db():
             ("default_unit", "km", "Unidade padrão para distâncias (km ou mi)")
         ]
         
-        for key, value, name in default_configs:
-            conn.execute("""
-            INSERT OR IGNORE INTO configurations (id, name, value, updated_at)
-            VALUES (?, ?, ?, ?)
-            """, (key, name, value, datetime.datetime.now().isoformat()))
-        
+        now = datetime.datetime.now().isoformat()
+        rows = [(key, name, value, now) for key, value, name in default_configs]
+        conn.execute("BEGIN")
+        conn.executemany("""
+        INSERT OR IGNORE INTO configurations (id, name, value, updated_at)
+        VALUES (?, ?, ?, ?)
+        """, rows)
         conn.commit()
 
-# Inicializar o banco de dados ao iniciar a aplicação
-init_db()
+# Cache em memória das configurações (id -> valor); só muda via PUT /configurations
+_config_cache: dict[str, str] = {}
+
+def load_config_cache():
+    with get_db_connection() as conn:
+        rows = conn.execute("SELECT id, value FROM configurations").fetchall()
+    _config_cache.clear()
+    _config_cache.update((row["id"], row["value"]) for row in rows)
+
+# Gravação dos cálculos em segundo plano: os registros são enfileirados e um único
+# escritor os insere em lotes, sem bloquear a resposta ao cliente
+CALCULATIONS_BATCH_SIZE = 64
+CALCULATIONS_FLUSH_INTERVAL = 0.05  # segundos
+
+def log_calculation(row):
+    app.state.calculation_queue.put_nowait(row)
+
+def _write_calculations(rows):
+    with get_db_connection() as conn:
+        conn.execute("BEGIN")
+        conn.executemany("""
+        INSERT INTO calculations 
+        (id, origin_city, origin_state, origin_address, 
+         destination_city, destination_state, destination_address, 
+         mode, distance, unit, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+
+async def _calculation_writer():
+    calculation_queue = app.state.calculation_queue
+    loop = asyncio.get_running_loop()
+    running = True
+    while running:
+        rows = []
+        item = await calculation_queue.get()
+        deadline = loop.time() + CALCULATIONS_FLUSH_INTERVAL
+        # Acumular até CALCULATIONS_BATCH_SIZE registros ou CALCULATIONS_FLUSH_INTERVAL
+        # segundos; None sinaliza o encerramento da aplicação
+        while item is not None:
+            rows.append(item)
+            if len(rows) >= CALCULATIONS_BATCH_SIZE:
+                break
+            try:
+                item = await asyncio.wait_for(calculation_queue.get(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                break
+        else:
+            running = False
+
+        if rows:
+            try:
+                await asyncio.to_thread(_write_calculations, rows)
+            except Exception:
+                logger.exception("Erro ao gravar %d cálculos", len(rows))
+
+@app.on_event("startup")
+async def startup_event():
+    # Inicializar o pool de conexões, o banco de dados e o cache de configurações
+    init_db_pool()
+    init_db()
+    load_config_cache()
+    # Compilar o cálculo de Haversine antes da primeira requisição
+    calculate_haversine_distance(0.0, 0.0, 0.0, 0.0)
+    app.state.calculation_queue = asyncio.Queue()
+    app.state.calculation_writer = asyncio.create_task(_calculation_writer())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Gravar os cálculos pendentes antes de fechar as conexões
+    app.state.calculation_queue.put_nowait(None)
+    await app.state.calculation_writer
+    close_db_pool()
 
 # Funções auxiliares para cálculo de distância
+def _hash(s):
+    # Soma dos code points feita em C: em latin-1 cada byte é o próprio code point
+    s = s.lower()
+    try:
+        return sum(s.encode("latin-1"))
+    except UnicodeEncodeError:
+        return sum(map(ord, s))
+
 def get_coordinates(city, state, address):
-    city_hash = sum(ord(c) for c in city.lower())
-    state_hash = sum(ord(c) for c in state.lower())
+    city_hash = _hash(city)
+    state_hash = _hash(state)
     lat = -30 + (city_hash % 25)
     lng = -70 + (state_hash % 35)
-    addr_hash = sum(ord(c) for c in address.lower())
+    addr_hash = _hash(address)
     lat_variation = (addr_hash % 100) / 1000
     lng_variation = (addr_hash % 100) / 1000
     return lat + lat_variation, lng + lng_variation
 
-def calculate_haversine_distance(lat1, lon1, lat2, lon2):
+@njit(cache=True, fastmath=True)
+def _haversine(lat1, lon1, lat2, lon2):
     R = 6371.0
     lat1_rad = math.radians(lat1)
     lon1_rad = math.radians(lon1)
@@ -92,12 +221,77 @@ def calculate_haversine_distance(lat1, lon1, lat2, lon2):
     distance = R * c
     return distance
 
+def calculate_haversine_distance(lat1, lon1, lat2, lon2):
+    # Corpo compilado pelo Numba em _haversine
+    return _haversine(float(lat1), float(lon1), float(lat2), float(lon2))
+
+def calculate_distance_batch(lat1, lon1, lat2, lon2):
+    # Versão vetorizada de calculate_haversine_distance para arrays de coordenadas
+    R = 6371.0
+    lat1_rad = np.radians(lat1)
+    lon1_rad = np.radians(lon1)
+    lat2_rad = np.radians(lat2)
+    lon2_rad = np.radians(lon2)
+    dlon = lon2_rad - lon1_rad
+    dlat = lat2_rad - lat1_rad
+    a = np.sin(dlat / 2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2)**2
+    c = 2 * np.arcsin(np.sqrt(a))
+    return R * c
+
 def get_config_value(key, default=None):
-    with get_db_connection() as conn:
-        result = conn.execute("SELECT value FROM configurations WHERE id = ?", (key,)).fetchone()
-        if result:
-            return result["value"]
-        return default
+    return _config_cache.get(key, default)
+
+def build_calculation(request, origin_coordinates, dest_coordinates, base_distance):
+    # Aplica multiplicador e unidade configurados, registra o cálculo e monta a resposta
+    origin = request.origin
+    destination = request.destination
+    mode = request.mode
+
+    multiplier_key = f"{mode}_multiplier"
+    multiplier = float(get_config_value(multiplier_key, 1.0))
+    distance = base_distance * multiplier
+    unit = get_config_value("default_unit", "km")
+
+    if unit.lower() == "mi":
+        distance = distance * 0.621371
+
+    distance = round(distance, 2)
+    calculation_id = str(uuid.uuid4())
+    now = datetime.datetime.now().isoformat()
+
+    log_calculation((
+        calculation_id,
+        origin.city,
+        origin.state,
+        origin.address,
+        destination.city,
+        destination.state,
+        destination.address,
+        mode,
+        distance,
+        unit,
+        now
+    ))
+
+    response = {
+        "id": calculation_id,
+        "origin": {
+            "city": origin.city,
+            "state": origin.state,
+            "coordinates": list(origin_coordinates)
+        },
+        "destination": {
+            "city": destination.city,
+            "state": destination.state,
+            "coordinates": list(dest_coordinates)
+        },
+        "distance": distance,
+        "unit": unit,
+        "mode": mode,
+        "created_at": now
+    }
+
+    return response
 
 # Modelos Pydantic para validação de dados
 class OriginDestination(BaseModel):
@@ -110,16 +304,32 @@ class CalculateRequest(BaseModel):
     destination: OriginDestination
     mode: str = "direct"
 
+class CalculateBatchRequest(BaseModel):
+    calculations: List[CalculateRequest]
+
 class ConfigurationUpdate(BaseModel):
     configurations: dict
 
+# Paginação por cursor (keyset): o cursor codifica (created_at, id) do último item
+# da página, evitando que o SQLite percorra e descarte registros com OFFSET
+def encode_cursor(created_at, item_id):
+    return base64.urlsafe_b64encode(f"{created_at}|{item_id}".encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        created_at, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return created_at, item_id
+
 # Rotas da API
 @app.get("/")
-def home():
+async def home():
     return {
         "message": "API Secundária para cálculo de distâncias funcionando",
         "endpoints": {
             "POST /calculate": "Calcula a distância entre dois endereços",
+            "POST /calculate/batch": "Calcula a distância para vários pares de endereços",
             "GET /calculations": "Lista cálculos realizados",
             "PUT /configurations": "Atualiza configurações do serviço",
             "DELETE /calculations/{calculation_id}": "Remove um cálculo do histórico"
@@ -127,10 +337,9 @@ def home():
     }
 
 @app.post("/calculate")
-def calculate_distance(request: CalculateRequest):
+async def calculate_distance(request: CalculateRequest):
     origin = request.origin
     destination = request.destination
-    mode = request.mode
 
     try:
         origin_lat, origin_lng = get_coordinates(origin.city, origin.state, origin.address)
@@ -139,85 +348,95 @@ def calculate_distance(request: CalculateRequest):
         raise HTTPException(status_code=500, detail=f"Erro ao obter coordenadas: {str(e)}")
 
     base_distance = calculate_haversine_distance(origin_lat, origin_lng, dest_lat, dest_lng)
-    multiplier_key = f"{mode}_multiplier"
-    multiplier = float(get_config_value(multiplier_key, 1.0))
-    distance = base_distance * multiplier
-    unit = get_config_value("default_unit", "km")
+    return build_calculation(request, (origin_lat, origin_lng), (dest_lat, dest_lng), base_distance)
 
-    if unit.lower() == "mi":
-        distance = distance * 0.621371
+@app.post("/calculate/batch")
+async def calculate_batch(batch: CalculateBatchRequest):
+    requests = batch.calculations
 
-    distance = round(distance, 2)
-    calculation_id = str(uuid.uuid4())
-    now = datetime.datetime.now().isoformat()
+    try:
+        origins = [get_coordinates(r.origin.city, r.origin.state, r.origin.address) for r in requests]
+        destinations = [
+            get_coordinates(r.destination.city, r.destination.state, r.destination.address)
+            for r in requests
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao obter coordenadas: {str(e)}")
 
-    with get_db_connection() as conn:
-        conn.execute("""
-        INSERT INTO calculations 
-        (id, origin_city, origin_state, origin_address, 
-         destination_city, destination_state, destination_address, 
-         mode, distance, unit, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            calculation_id,
-            origin.city,
-            origin.state,
-            origin.address,
-            destination.city,
-            destination.state,
-            destination.address,
-            mode,
-            distance,
-            unit,
-            now
-        ))
-        conn.commit()
+    if not requests:
+        return []
 
-    response = {
-        "id": calculation_id,
-        "origin": {
-            "city": origin.city,
-            "state": origin.state,
-            "coordinates": [origin_lat, origin_lng]
-        },
-        "destination": {
-            "city": destination.city,
-            "state": destination.state,
-            "coordinates": [dest_lat, dest_lng]
-        },
-        "distance": distance,
-        "unit": unit,
-        "mode": mode,
-        "created_at": now
-    }
+    # Calcular todas as distâncias de uma vez sobre arrays NumPy
+    origin_array = np.array(origins, dtype=np.float64)
+    dest_array = np.array(destinations, dtype=np.float64)
+    base_distances = calculate_distance_batch(
+        origin_array[:, 0], origin_array[:, 1], dest_array[:, 0], dest_array[:, 1]
+    )
 
-    return response
+    return [
+        build_calculation(r, origin, destination, float(base_distance))
+        for r, origin, destination, base_distance in zip(requests, origins, destinations, base_distances)
+    ]
 
-@app.get("/calculations")
-def get_calculations(limit: int = 10, offset: int = 0):
+# Acesso ao banco das rotas assíncronas; executado em threads via asyncio.to_thread
+# para não bloquear o event loop
+def _list_calculations(limit, cursor_key=None):
     with get_db_connection() as conn:
-        result = conn.execute(
-            "SELECT * FROM calculations ORDER BY created_at DESC LIMIT ? OFFSET ?", 
-            (limit, offset)
-        ).fetchall()
-        calculations = [dict(row) for row in result]
-        return calculations
+        if cursor_key:
+            result = conn.execute(
+                """
+                SELECT * FROM calculations WHERE (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC LIMIT ?
+                """,
+                (*cursor_key, limit)
+            ).fetchall()
+        else:
+            result = conn.execute(
+                "SELECT * FROM calculations ORDER BY created_at DESC, id DESC LIMIT ?", 
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in result]
 
-@app.put("/configurations")
-def update_configuration(config_update: ConfigurationUpdate):
+def _update_configurations(configurations, now):
     updated_configs = []
-    now = datetime.datetime.now().isoformat()
-
     with get_db_connection() as conn:
-        for key, value in config_update.configurations.items():
-            existing = conn.execute("SELECT id FROM configurations WHERE id = ?", (key,)).fetchone()
-            if existing:
+        conn.execute("BEGIN")
+        for key, value in configurations.items():
+            if key in _config_cache:
                 conn.execute(
                     "UPDATE configurations SET value = ?, updated_at = ? WHERE id = ?",
                     (str(value), now, key)
                 )
                 updated_configs.append(key)
         conn.commit()
+    return updated_configs
+
+def _delete_calculation(calculation_id):
+    with get_db_connection() as conn:
+        cursor = conn.execute("DELETE FROM calculations WHERE id = ?", (calculation_id,))
+        conn.commit()
+        return cursor.rowcount > 0
+
+@app.get("/calculations")
+async def get_calculations(limit: int = 10, cursor: Optional[str] = None):
+    cursor_key = decode_cursor(cursor) if cursor else None
+    calculations = await asyncio.to_thread(_list_calculations, limit, cursor_key)
+
+    next_cursor = None
+    if calculations and len(calculations) == limit:
+        next_cursor = encode_cursor(calculations[-1]["created_at"], calculations[-1]["id"])
+
+    return {"items": calculations, "next_cursor": next_cursor}
+
+@app.put("/configurations")
+async def update_configuration(config_update: ConfigurationUpdate):
+    now = datetime.datetime.now().isoformat()
+    updated_configs = await asyncio.to_thread(
+        _update_configurations, config_update.configurations, now
+    )
+
+    for key in updated_configs:
+        _config_cache[key] = str(config_update.configurations[key])
 
     if not updated_configs:
         raise HTTPException(status_code=400, detail="Nenhuma configuração válida foi fornecida")
@@ -225,17 +444,14 @@ def update_configuration(config_update: ConfigurationUpdate):
     return {"updated": updated_configs, "timestamp": now}
 
 @app.delete("/calculations/{calculation_id}")
-def delete_calculation(calculation_id: str):
-    with get_db_connection() as conn:
-        existing = conn.execute("SELECT id FROM calculations WHERE id = ?", (calculation_id,)).fetchone()
-        if not existing:
-            raise HTTPException(status_code=404, detail="Cálculo não encontrado")
-        conn.execute("DELETE FROM calculations WHERE id = ?", (calculation_id,))
-        conn.commit()
+async def delete_calculation(calculation_id: str):
+    deleted = await asyncio.to_thread(_delete_calculation, calculation_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Cálculo não encontrado")
     return {"status": "deleted", "id": calculation_id}
 
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "ok", "timestamp": datetime.datetime.now().isoformat()}
 
 if __name__ == '__main__':